@@ -4,10 +4,19 @@ Simple Redshift MCP Server using FastMCP
 A minimal MCP server that provides basic Redshift database operations.
 """
 import os
-from typing import Optional, List, Dict, Any
+import re
+import time
+import hashlib
+import functools
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, AsyncIterator, Set, Sequence, Callable, Tuple, TypeVar
 from dotenv import load_dotenv
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
 load_dotenv()
 
@@ -15,10 +24,19 @@ load_dotenv()
 if 'DB_MCP_MODE' not in os.environ:
     os.environ['DB_MCP_MODE'] = 'readonly'
 
+# Database driver, resolved once at import: Amazon's redshift_connector, or psycopg2 as a fallback
 try:
-    import redshift_connector
+    import redshift_connector as db_driver
+    DRIVER = 'redshift_connector'
 except ImportError:
-    import psycopg2 as redshift_connector
+    import psycopg2 as db_driver
+    import psycopg2.extras as db_driver_extras
+    DRIVER = 'psycopg2'
+
+# Whether parameters can be passed to EXECUTE of a prepared statement. psycopg2 interpolates them
+# into the SQL text client-side; redshift_connector binds them server-side, and EXECUTE, being a
+# utility statement, accepts no bind parameters ("there is no parameter $1").
+PREPARED_EXECUTE = DRIVER == 'psycopg2'
 
 from mcp.server.fastmcp import FastMCP
 
@@ -29,67 +47,779 @@ logger = logging.getLogger(__name__)
 # Create FastMCP server instance
 mcp = FastMCP("Redshift MCP Server", host='0.0.0.0', port='8000')
 
-# Connection state
-@dataclass
-class ConnectionState:
-    conn: Optional[Any] = None
-    cursor: Optional[Any] = None
+
+# --- CONFIGURATION ---
+
+# Maximum number of concurrent Redshift sessions opened by the server
+POOL_MAX_SIZE = max(1, int(os.getenv('REDSHIFT_POOL_SIZE', '5')))
+
+# Maximum number of user statements kept prepared per pooled connection
+STATEMENT_CACHE_SIZE = 256
+
+# Rows fetched per round trip when reading query results
+QUERY_FETCH_SIZE = 1000
+
+# Result layouts supported by the query tool
+QUERY_FORMATS = frozenset({'rows', 'columnar'})
+
+# Parameter rows sent per round trip by execute() batches
+BATCH_PAGE_SIZE = 1000
+
+# Most bind parameters the wire protocol allows in one statement (a 16-bit count)
+MAX_BIND_PARAMETERS = 32767
+
+# Seconds a list_schemas/list_tables/describe_table result is served from memory (0 disables)
+METADATA_CACHE_TTL = float(os.getenv('REDSHIFT_METADATA_CACHE_TTL', '60'))
+
+
+@dataclass(frozen=True)
+class EnvConfig:
+    """Connection settings from the REDSHIFT_* environment variables (unset or empty values are None)."""
     host: Optional[str] = None
     database: Optional[str] = None
     user: Optional[str] = None
+    password: Optional[str] = None
+    port: int = 5439
+
+# Environment is loaded once (including .env) and does not change for the life of the process
+ENV = EnvConfig(
+    host=os.getenv('REDSHIFT_HOST') or None,
+    database=os.getenv('REDSHIFT_DATABASE') or None,
+    user=os.getenv('REDSHIFT_USER') or None,
+    password=os.getenv('REDSHIFT_PASSWORD') or None,
+    port=int(os.getenv('REDSHIFT_PORT') or 5439)
+)
+
+
+def get_env_connection_params() -> Dict[str, Any]:
+    """Get connection parameters from environment variables if available."""
+    return {key: value for key, value in asdict(ENV).items() if value is not None}
 
-# Global connection state
-connection_state = ConnectionState()
 
 # --- MODE ENFORCEMENT ---
 
-def get_mcp_mode() -> str:
-    """Get the current MCP mode from environment variable (readonly, readwrite, admin)."""
+MCP_MODES = frozenset({'readonly', 'readwrite', 'admin'})
+
+
+def read_mcp_mode() -> str:
+    """Read the MCP mode from the DB_MCP_MODE environment variable, defaulting to readonly."""
     mode = os.getenv('DB_MCP_MODE', 'readonly').lower()
-    if mode not in ('readonly', 'readwrite', 'admin'):
-        mode = 'readonly'
-    return mode
+    return mode if mode in MCP_MODES else 'readonly'
+
+# DB_MCP_MODE is process-wide, so it is resolved once at import
+_MCP_MODE = read_mcp_mode()
 
-FORBIDDEN_READONLY = [
+
+def get_mcp_mode() -> str:
+    """Get the current MCP mode (readonly, readwrite, admin)."""
+    return _MCP_MODE
+
+
+def reload_mode() -> str:
+    """Re-read DB_MCP_MODE from the environment (e.g. after changing it in tests) and return the new mode."""
+    global _MCP_MODE
+    _MCP_MODE = read_mcp_mode()
+    return _MCP_MODE
+
+FORBIDDEN_READONLY = frozenset({
     'insert', 'update', 'delete', 'drop', 'truncate', 'alter', 'create', 'grant', 'revoke', 'comment', 'set', 'copy', 'unload', 'vacuum', 'analyze', 'merge'
-]
-FORBIDDEN_READWRITE = [
+})
+FORBIDDEN_READWRITE = frozenset({
     'delete', 'drop', 'truncate', 'alter', 'grant', 'revoke', 'comment', 'set', 'copy', 'unload', 'vacuum', 'analyze', 'merge'
-]
+})
+FORBIDDEN_BY_MODE = {
+    'readonly': FORBIDDEN_READONLY,
+    'readwrite': FORBIDDEN_READWRITE,
+}
+
+# Leading whitespace followed by the first word of a statement
+_FIRST_WORD_RE = re.compile(r'\s*(\S*)')
+
+
+def first_keyword(sql: str) -> str:
+    """Return the lowercased first word of a SQL statement without copying the rest of it."""
+    return _FIRST_WORD_RE.match(sql).group(1).lower()
 
 
 def is_forbidden(sql: str, mode: str) -> Optional[str]:
     """Check if the SQL statement is forbidden in the current mode. Returns reason if forbidden, else None."""
-    sql_trim = sql.strip().lower()
-    # Only check the first word (command)
-    first_word = sql_trim.split()[0] if sql_trim else ''
-    if mode == 'readonly':
-        if first_word in FORBIDDEN_READONLY:
-            return f"'{first_word.upper()}' statements are not allowed in readonly mode."
-    elif mode == 'readwrite':
-        if first_word in FORBIDDEN_READWRITE:
-            return f"'{first_word.upper()}' statements are not allowed in readwrite mode."
+    forbidden = FORBIDDEN_BY_MODE.get(mode)
     # admin: allow everything
+    if forbidden is None:
+        return None
+    # Only check the first word (command)
+    first_word = first_keyword(sql)
+    if first_word in forbidden:
+        return f"'{first_word.upper()}' statements are not allowed in {mode} mode."
     return None
 
 
-def get_env_connection_params() -> Dict[str, Any]:
-    """Get connection parameters from environment variables if available."""
-    params = {}
-    
-    # Check for environment variables
-    if os.getenv('REDSHIFT_HOST'):
-        params['host'] = os.getenv('REDSHIFT_HOST')
-    if os.getenv('REDSHIFT_DATABASE'):
-        params['database'] = os.getenv('REDSHIFT_DATABASE')
-    if os.getenv('REDSHIFT_USER'):
-        params['user'] = os.getenv('REDSHIFT_USER')
-    if os.getenv('REDSHIFT_PASSWORD'):
-        params['password'] = os.getenv('REDSHIFT_PASSWORD')
-    if os.getenv('REDSHIFT_PORT'):
-        params['port'] = int(os.getenv('REDSHIFT_PORT'))
-    
-    return params
+# Statements that change the catalog and therefore invalidate cached metadata
+DDL_COMMANDS = frozenset({'create', 'drop', 'alter', 'truncate'})
+
+# Statement types Redshift can PREPARE
+PREPARABLE_COMMANDS = frozenset({'select', 'insert', 'update', 'delete'})
+
+# Statements whose results can be read through a server-side cursor
+CURSOR_COMMANDS = frozenset({'select', 'with'})
+
+
+# --- CONNECTION POOL ---
+
+T = TypeVar('T')
+
+# Worker threads for driver calls, one per pooled connection. Kept apart from the
+# default executor, which runs ConnectionPool.getconn() and may block waiting for a connection:
+# sharing it could leave no thread free to hand a connection back.
+_db_executor = ThreadPoolExecutor(max_workers=POOL_MAX_SIZE, thread_name_prefix='redshift-db')
+
+
+async def run_db(fn: Callable[..., T], *args: Any) -> T:
+    """Run a blocking driver call on the database executor so the event loop keeps serving other tools."""
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, fn, *args)
+
+
+def open_connection(params: Dict[str, Any]) -> Any:
+    """Open a new connection with the selected driver, requiring SSL."""
+    if DRIVER == 'psycopg2':
+        return db_driver.connect(sslmode='require', **params)
+    return db_driver.connect(ssl=True, **params)
+
+
+def make_cursor(conn: Any, dict_rows: bool = False, name: Optional[str] = None) -> Any:
+    """
+    Open a cursor; with dict_rows, one returning dictionaries if the driver provides it (psycopg2 only).
+
+    With psycopg2, a ``name`` opens a server-side (named) cursor; redshift_connector has none.
+    """
+    if DRIVER == 'psycopg2':
+        factory = db_driver_extras.RealDictCursor if dict_rows else None
+        return conn.cursor(name, cursor_factory=factory)
+    return conn.cursor()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of Redshift connections.
+
+    Connections are opened lazily up to ``maxconn`` and handed out one per
+    tool call, so concurrent MCP requests no longer share a single session.
+    """
+
+    def __init__(self, params: Dict[str, Any], maxconn: int = POOL_MAX_SIZE):
+        self.params = params
+        self.maxconn = max(1, maxconn)
+        self._idle: List[Any] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        # Names of server-side prepared statements, keyed by id() of the connection
+        self._prepared: Dict[int, Set[str]] = {}
+        # LRU of user SQL -> prepared statement name (None if not preparable), keyed by id() of the connection
+        self._statements: Dict[int, OrderedDict] = {}
+        # id() of connections whose prepared statements predate a schema change
+        self._stale: Set[int] = set()
+        # Driver call currently running on each checked-out connection, keyed by id(); event loop only
+        self._inflight: Dict[int, asyncio.Future] = {}
+
+    def getconn(self) -> Any:
+        """Return an idle connection, opening a new one if below ``maxconn``. Blocks when exhausted."""
+        with self._cond:
+            while not self._idle and self._size >= self.maxconn:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                self._cond.wait()
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+
+        try:
+            return open_connection(self.params)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn: Any, close: bool = False) -> None:
+        """Return a connection to the pool, or close it if requested or the pool is closed."""
+        with self._cond:
+            if close or self._closed:
+                self._size -= 1
+                self._forget(conn)
+            else:
+                self._idle.append(conn)
+                conn = None
+            self._cond.notify()
+
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.warning(f"Closing pooled connection failed: {str(e)}")
+
+    def closeall(self) -> None:
+        """Close idle connections; connections still checked out are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            for conn in idle:
+                self._forget(conn)
+            self._cond.notify_all()
+
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.warning(f"Closing pooled connection failed: {str(e)}")
+
+    def _forget(self, conn: Any) -> None:
+        """Drop the prepared statement bookkeeping of a connection being closed."""
+        self._prepared.pop(id(conn), None)
+        self._statements.pop(id(conn), None)
+        self._stale.discard(id(conn))
+
+    def prepared(self, conn: Any) -> Set[str]:
+        """Return the set of statement names already prepared on ``conn``."""
+        with self._cond:
+            return self._prepared.setdefault(id(conn), set())
+
+    def statements(self, conn: Any) -> OrderedDict:
+        """Return the prepared user statement cache of ``conn``."""
+        with self._cond:
+            return self._statements.setdefault(id(conn), OrderedDict())
+
+    def invalidate_statements(self) -> None:
+        """Mark every connection with prepared statements to DEALLOCATE them before its next use, e.g. after DDL."""
+        with self._cond:
+            self._stale.update(key for key, names in self._prepared.items() if names)
+            self._stale.update(key for key, cached in self._statements.items() if cached)
+
+    def deallocate_all(self, conn: Any) -> None:
+        """DEALLOCATE every prepared statement of ``conn`` and forget them; see invalidate_statements()."""
+        make_cursor(conn).execute("DEALLOCATE ALL")
+        with self._cond:
+            self._prepared.get(id(conn), set()).clear()
+            self._statements.get(id(conn), OrderedDict()).clear()
+            self._stale.discard(id(conn))
+
+    def release(self, conn: Any) -> None:
+        """
+        Commit a connection after a successful call and return it, closing it if the commit fails.
+
+        Both drivers open a transaction implicitly, and one left open on an idle connection
+        keeps its locks and snapshot: DDL elsewhere would block on it, and later reads would
+        not see newer commits.
+        """
+        try:
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"Committing pooled connection failed: {str(e)}")
+            self.putconn(conn, close=True)
+        else:
+            self.putconn(conn)
+
+    def reset(self, conn: Any) -> None:
+        """Roll back a connection after a failed call and return it, closing it if the rollback fails."""
+        try:
+            conn.rollback()
+        except Exception:
+            self.putconn(conn, close=True)
+        else:
+            self.putconn(conn)
+
+    def _return_abandoned(self, future: asyncio.Future) -> None:
+        """Done callback putting back a connection checked out for an acquire() that was cancelled."""
+        if not future.cancelled() and future.exception() is None:
+            _db_executor.submit(self.putconn, future.result())
+
+    def _close_when_done(self, conn: Any, future: asyncio.Future) -> None:
+        """Done callback closing a connection abandoned by a cancelled acquire() once its last call finished."""
+        if not future.cancelled():
+            future.exception()  # Nobody awaits the call any more; mark its outcome as retrieved
+        _db_executor.submit(self.putconn, conn, True)
+
+    async def run(self, conn: Any, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run a blocking driver call that uses ``conn`` on the database executor.
+
+        The call is shielded from cancellation and tracked, so that a cancelled acquire()
+        closes the connection only after the worker thread is done with it.
+        """
+        future = asyncio.get_running_loop().run_in_executor(_db_executor, fn, *args)
+        self._inflight[id(conn)] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._inflight.pop(id(conn), None)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """
+        Check out a connection for the duration of an ``async with`` block.
+
+        The connection is owned by the calling task until the block exits, so it never
+        needs a lock of its own. Driver calls on it should go through run(). Its transaction
+        is committed when the block exits normally and rolled back when it raises.
+        """
+        pending = asyncio.get_running_loop().run_in_executor(None, self.getconn)
+        try:
+            conn = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # getconn() keeps running in its thread; hand back whatever it returns
+            pending.add_done_callback(self._return_abandoned)
+            raise
+        try:
+            with self._cond:
+                stale = id(conn) in self._stale
+            if stale:
+                await self.run(conn, self.deallocate_all, conn)
+            yield conn
+        except Exception:
+            # Hand the connection back clean, without blocking the event loop on the rollback.
+            # Shielded: a cancellation before the executor picks it up must not skip the hand-back.
+            await asyncio.shield(run_db(self.reset, conn))
+            raise
+        except BaseException:
+            # Cancelled mid-call: never reuse the connection, and close it off the event loop
+            # once any worker thread still using it is done, keeping it counted until then
+            running = self._inflight.pop(id(conn), None)
+            if running is None:
+                _db_executor.submit(self.putconn, conn, True)
+            else:
+                running.add_done_callback(functools.partial(self._close_when_done, conn))
+            raise
+        else:
+            # End the implicit transaction, off the event loop like the rollback above; this is
+            # also where a connection returned to a pool closed meanwhile gets closed
+            await asyncio.shield(run_db(self.release, conn))
+
+
+# Connection state
+@dataclass(slots=True)
+class ConnectionState:
+    pool: Optional[ConnectionPool] = None
+    host: Optional[str] = None
+    database: Optional[str] = None
+    user: Optional[str] = None
+
+# Global connection state
+connection_state = ConnectionState()
+
+
+# --- BLOCKING DRIVER CALLS ---
+
+@dataclass(frozen=True, slots=True)
+class PreparedStatement:
+    """A fixed statement prepared once per connection under ``name``; ``sql`` uses %s placeholders."""
+    name: str
+    sql: str
+    arg_types: Tuple[str, ...] = ()
+
+
+# Catalog queries behind list_schemas, list_tables and describe_table
+_SQL_LIST_SCHEMAS = PreparedStatement("mcp_list_schemas", """
+    SELECT schema_name 
+    FROM information_schema.schemata 
+    WHERE schema_name NOT IN ('pg_catalog', 'information_schema')
+    ORDER BY schema_name
+""")
+
+_SQL_LIST_TABLES = PreparedStatement("mcp_list_tables", """
+    SELECT table_name 
+    FROM information_schema.tables 
+    WHERE table_schema = %s 
+    AND table_type = 'BASE TABLE'
+    ORDER BY table_name
+""", ("varchar",))
+
+_SQL_DESCRIBE_TABLE = PreparedStatement("mcp_describe_table", """
+    SELECT 
+        column_name,
+        data_type,
+        character_maximum_length,
+        numeric_precision,
+        numeric_scale,
+        is_nullable,
+        column_default
+    FROM information_schema.columns
+    WHERE table_schema = %s AND table_name = %s
+    ORDER BY ordinal_position
+""", ("varchar", "varchar"))
+
+
+def execute_call(name: str, argc: int) -> str:
+    """Build the EXECUTE statement for a prepared statement taking argc driver parameters."""
+    return f"EXECUTE {name}({', '.join(['%s'] * argc)})" if argc else f"EXECUTE {name}"
+
+
+# Driver placeholder and escape sequences (%s, %%, or any other %-sequence)
+_PLACEHOLDER_RE = re.compile(r'%.?', re.S)
+
+
+def to_positional_placeholders(sql: str, argc: int) -> Optional[str]:
+    """
+    Rewrite driver-style %s placeholders as $1, $2, ... for use in PREPARE.
+    
+    Returns None if the statement cannot be rewritten safely: it uses other %-sequences
+    (e.g. %(name)s), already contains $ characters, or its placeholder count differs from argc.
+    """
+    if '$' in sql:
+        return None
+    
+    count = 0
+    
+    def replace(match: re.Match) -> str:
+        nonlocal count
+        token = match.group()
+        if token == '%%':
+            return '%'
+        if token != '%s':
+            raise ValueError(token)
+        count += 1
+        return f'${count}'
+    
+    try:
+        body = _PLACEHOLDER_RE.sub(replace, sql)
+    except ValueError:
+        return None
+    return body if count == argc else None
+
+
+def discard_prepared(conn: Any, cursor: Any, name: str) -> None:
+    """
+    Best-effort DEALLOCATE of a prepared statement whose EXECUTE failed, so it is prepared afresh next time.
+
+    The failure may mean the statement is stale (a referenced table was recreated, or a
+    SELECT * changed its result type) or already gone (DEALLOCATE ALL). The failed EXECUTE
+    aborted the transaction, so it is rolled back first; prepared statements survive that.
+    """
+    conn.rollback()
+    try:
+        cursor.execute(f"DEALLOCATE {name}")
+    except Exception as e:
+        logger.debug(f"Cannot deallocate statement {name}: {str(e)}")
+        conn.rollback()
+
+
+def execute_prepared(
+    conn: Any,
+    cursor: Any,
+    prepared: Set[str],
+    statement: PreparedStatement,
+    params: Sequence[Any] = ()
+) -> None:
+    """
+    Execute a server-side prepared statement, preparing it on first use.
+
+    Without PREPARED_EXECUTE support the statement runs as an ordinary parameterized query.
+
+    Args:
+        conn: Connection the statement belongs to
+        cursor: Cursor of that connection
+        prepared: Statement names already prepared on that connection
+        statement: Statement to run
+        params: Values bound to the placeholders
+    """
+    if not PREPARED_EXECUTE:
+        if params:
+            cursor.execute(statement.sql, tuple(params))
+        else:
+            cursor.execute(statement.sql)
+        return
+
+    if statement.name not in prepared:
+        signature = f"{statement.name}({', '.join(statement.arg_types)})" if statement.arg_types else statement.name
+        body = to_positional_placeholders(statement.sql, len(statement.arg_types))
+        cursor.execute(f"PREPARE {signature} AS {body}")
+        prepared.add(statement.name)
+
+    try:
+        cursor.execute(execute_call(statement.name, len(params)), tuple(params) if params else None)
+    except Exception:
+        prepared.discard(statement.name)
+        discard_prepared(conn, cursor, statement.name)
+        raise
+
+
+def prepare_cached(conn: Any, cursor: Any, statements: OrderedDict, sql: str, argc: int) -> Optional[str]:
+    """
+    Look up or create the server-side prepared statement for a parameterized user statement.
+    
+    Statements are cached per connection in LRU order; the least recently used one is
+    DEALLOCATEd once more than STATEMENT_CACHE_SIZE are cached. Returns the statement name,
+    or None to execute the SQL directly.
+    """
+    if sql in statements:
+        statements.move_to_end(sql)
+        return statements[sql]
+    
+    name = None
+    body = to_positional_placeholders(sql, argc) if first_keyword(sql) in PREPARABLE_COMMANDS else None
+    if body is not None:
+        name = f"mcp_{hashlib.blake2b(sql.encode(), digest_size=8).hexdigest()}"
+        try:
+            cursor.execute(f"PREPARE {name} AS {body}")
+        except Exception as e:
+            # e.g. parameter types Redshift cannot infer; remember to run it directly.
+            # Nothing else has run in this call yet, so the rollback only clears the failed PREPARE.
+            logger.debug(f"Cannot prepare statement, executing directly: {str(e)}")
+            conn.rollback()
+            name = None
+    
+    statements[sql] = name
+    if len(statements) > STATEMENT_CACHE_SIZE:
+        _, evicted = statements.popitem(last=False)
+        if evicted:
+            cursor.execute(f"DEALLOCATE {evicted}")
+    return name
+
+
+def execute_statement(conn: Any, cursor: Any, statements: OrderedDict, sql: str, params: Optional[List[Any]]) -> None:
+    """Execute user SQL, reusing a cached prepared statement when it is parameterized (psycopg2 only, see PREPARED_EXECUTE)."""
+    if not params:
+        cursor.execute(sql)
+        return
+    if not PREPARED_EXECUTE:
+        cursor.execute(sql, params)
+        return
+    
+    name = prepare_cached(conn, cursor, statements, sql, len(params))
+    if name is None:
+        cursor.execute(sql, params)
+        return
+    try:
+        cursor.execute(execute_call(name, len(params)), params)
+    except Exception:
+        statements.pop(sql, None)
+        discard_prepared(conn, cursor, name)
+        raise
+
+
+# Name of the server-side cursor behind a ResultStream; a connection runs one stream at a time
+_STREAM_CURSOR = 'mcp_stream'
+
+
+class ResultStream:
+    """
+    The rows of a query, read through a server-side cursor so that only rows fetched so far reach the client.
+
+    psycopg2 uses a named cursor. redshift_connector has none, so parameterless queries are
+    wrapped in DECLARE ... CURSOR and read with FETCH FORWARD. DECLARE takes no bind parameters,
+    so with redshift_connector parameterized queries, like statements other than SELECT/WITH,
+    run on an ordinary cursor, which the driver reads in full on execute.
+
+    The methods block; call them on the database executor. Rolling back the connection also
+    closes the cursor.
+    """
+
+    def __init__(
+        self,
+        conn: Any,
+        statements: OrderedDict,
+        sql: str,
+        params: Optional[List[Any]] = None,
+        dict_rows: bool = False
+    ):
+        self.columns: List[str] = []
+        self._fetch_sql: Optional[str] = None
+        self._close_sql: Optional[str] = None
+        self._named = False
+
+        if first_keyword(sql) not in CURSOR_COMMANDS:
+            self._cursor = make_cursor(conn, dict_rows)
+            execute_statement(conn, self._cursor, statements, sql, params)
+        elif DRIVER == 'psycopg2':
+            self._cursor = make_cursor(conn, dict_rows, name=_STREAM_CURSOR)
+            self._cursor.execute(sql, params)
+            self._named = True
+        elif not params:
+            # DECLARE takes a single statement, without its terminating semicolon
+            self._cursor = make_cursor(conn)
+            self._cursor.execute(f"DECLARE {_STREAM_CURSOR} CURSOR FOR {sql.strip().rstrip(';')}")
+            self._fetch_sql = f"FETCH FORWARD {{size}} FROM {_STREAM_CURSOR}"
+            self._close_sql = f"CLOSE {_STREAM_CURSOR}"
+        else:
+            self._cursor = make_cursor(conn)
+            execute_statement(conn, self._cursor, statements, sql, params)
+
+    def fetch(self, size: int) -> List[Any]:
+        """Fetch up to ``size`` more rows; an empty list once the result is exhausted or has no rows."""
+        if self._fetch_sql is not None:
+            self._cursor.execute(self._fetch_sql.format(size=int(size)))
+            rows = self._cursor.fetchall()
+        elif self._named or self._cursor.description:
+            rows = self._cursor.fetchmany(size)
+        else:
+            return []
+
+        # Named and declared cursors only describe their columns once rows are fetched
+        if not self.columns and self._cursor.description:
+            self.columns = [desc[0] for desc in self._cursor.description]
+        return rows
+
+    def close(self) -> None:
+        """Release the server-side cursor, if any, and the client cursor."""
+        try:
+            if self._close_sql is not None:
+                self._cursor.execute(self._close_sql)
+        finally:
+            self._cursor.close()
+
+
+def fetch_query_rows(
+    conn: Any,
+    statements: OrderedDict,
+    sql: str,
+    params: Optional[List[Any]],
+    max_rows: Optional[int],
+    dict_rows: bool = False
+) -> Tuple[List[str], List[Any]]:
+    """
+    Execute a query and fetch its rows.
+    
+    Without max_rows, both drivers read the whole result on execute, so it is fetched at once.
+    With max_rows, the rows are read through a ResultStream in batches of QUERY_FETCH_SIZE
+    and at most max_rows + 1 are fetched, the extra row only showing that the result was
+    truncated. With dict_rows, rows are fetched as dictionaries when the driver supports it
+    (psycopg2). Returns (columns, rows).
+    """
+    if max_rows is not None:
+        stream = ResultStream(conn, statements, sql, params, dict_rows)
+        rows = []
+        while len(rows) <= max_rows:
+            batch = stream.fetch(min(QUERY_FETCH_SIZE, max_rows + 1 - len(rows)))
+            if not batch:
+                break
+            rows.extend(batch)
+        stream.close()
+        return stream.columns, rows
+    
+    cursor = make_cursor(conn, dict_rows)
+    
+    # Execute query with or without parameters
+    execute_statement(conn, cursor, statements, sql, params)
+    
+    if not cursor.description:
+        return [], []
+    return [desc[0] for desc in cursor.description], list(cursor.fetchall())
+
+
+# Whether driver cursors expose rowcount; probed by connect_db on the first pooled connection
+_HAS_ROWCOUNT = True
+
+
+def run_statement(conn: Any, statements: OrderedDict, sql: str, params: Optional[List[Any]]) -> int:
+    """Execute and commit a statement. Returns the affected row count, or -1 if unknown."""
+    cursor = make_cursor(conn)
+    
+    # Execute statement
+    execute_statement(conn, cursor, statements, sql, params)
+    
+    # Commit the transaction
+    conn.commit()
+    
+    return cursor.rowcount if _HAS_ROWCOUNT else -1
+
+
+# INSERT ... VALUES (<one row template>) with nothing after the row; nested parentheses are not matched
+_INSERT_VALUES_RE = re.compile(r'^(\s*insert\s.+?\svalues\s*)(\([^()]*\))\s*;?\s*$', re.I | re.S)
+
+
+def run_batch(conn: Any, sql: str, rows: List[Sequence[Any]]) -> int:
+    """
+    Execute a statement once per parameter row using batched round trips, then commit.
+    
+    INSERT ... VALUES (...) statements are rewritten into multi-row inserts of up to
+    BATCH_PAGE_SIZE rows each, fewer for wide rows so a page stays within
+    MAX_BIND_PARAMETERS. Other statements use psycopg2.extras.execute_batch, or
+    executemany with redshift_connector. Returns the affected row count, or -1 if unknown.
+    """
+    cursor = make_cursor(conn)
+    insert = _INSERT_VALUES_RE.match(sql)
+    
+    if insert:
+        prefix, template = insert.groups()
+        page_size = max(1, min(BATCH_PAGE_SIZE, MAX_BIND_PARAMETERS // max(1, len(rows[0]))))
+        total = 0
+        for start in range(0, len(rows), page_size):
+            page = rows[start:start + page_size]
+            cursor.execute(
+                prefix + ", ".join([template] * len(page)),
+                [value for row in page for value in row]
+            )
+            if total >= 0:
+                total = total + cursor.rowcount if cursor.rowcount >= 0 else -1
+        rowcount = total
+    elif DRIVER == 'psycopg2':
+        # Sends BATCH_PAGE_SIZE statements per round trip; rowcount then only covers the last one
+        db_driver_extras.execute_batch(cursor, sql, rows, page_size=BATCH_PAGE_SIZE)
+        rowcount = -1
+    else:
+        cursor.executemany(sql, rows)
+        rowcount = cursor.rowcount
+    
+    # Commit the transaction
+    conn.commit()
+    
+    return rowcount
+
+
+def fetch_prepared(
+    conn: Any,
+    prepared: Set[str],
+    statement: PreparedStatement,
+    params: Sequence[Any] = ()
+) -> List[Any]:
+    """Run a prepared statement (see execute_prepared) on a new cursor and fetch all rows."""
+    cursor = make_cursor(conn)
+    execute_prepared(conn, cursor, prepared, statement, params)
+    return cursor.fetchall()
+
+
+# --- METADATA CACHE ---
+
+# (host, database, user, tool, *args) -> (stored_at, result)
+_metadata_cache: Dict[tuple, tuple] = {}
+
+# Bumped by every invalidation, so a lookup that started before one does not store its result
+_metadata_generation = 0
+
+
+def metadata_cache_key(tool: str, *args: Any) -> tuple:
+    """Build a metadata cache key scoped to the current connection."""
+    return (connection_state.host, connection_state.database, connection_state.user, tool) + args
+
+
+def get_cached_metadata(key: tuple) -> Optional[Dict[str, Any]]:
+    """Return a cached metadata result if it is still fresh, else None."""
+    entry = _metadata_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, result = entry
+    if time.monotonic() - stored_at >= METADATA_CACHE_TTL:
+        _metadata_cache.pop(key, None)
+        return None
+    return result
+
+
+def metadata_generation() -> int:
+    """Return the current metadata cache generation; read it before starting a lookup."""
+    return _metadata_generation
+
+
+def cache_metadata(key: tuple, result: Dict[str, Any], generation: int) -> Dict[str, Any]:
+    """Store a successful metadata result and return it, unless the cache was invalidated since ``generation``."""
+    if METADATA_CACHE_TTL > 0 and generation == _metadata_generation:
+        _metadata_cache[key] = (time.monotonic(), result)
+    return result
+
+
+# --- TOOLS ---
 
 async def auto_connect():
     """Automatically connect using environment variables if available."""
@@ -107,6 +837,21 @@ async def auto_connect():
     else:
         logger.info("Environment variables not configured for auto-connection. Use connect_db tool to connect.")
 
+# Serializes auto-connection so concurrent first calls open a single pool
+_connect_lock = asyncio.Lock()
+
+
+async def ensure_connected() -> Optional[Dict[str, Any]]:
+    """Auto-connect on first use. Returns an error response if still not connected, else None."""
+    if connection_state.pool:
+        return None
+    async with _connect_lock:
+        if not connection_state.pool:
+            await auto_connect()
+    if connection_state.pool:
+        return None
+    return {"error": "Not connected to database. Use connect_db or set environment variables."}
+
 @mcp.tool()
 async def connect_db(
     host: Optional[str] = None,
@@ -135,7 +880,7 @@ async def connect_db(
     Returns:
         Connection status and details
     """
-    global connection_state
+    global _HAS_ROWCOUNT
     
     # Get environment variables
     env_params = get_env_connection_params()
@@ -148,32 +893,37 @@ async def connect_db(
     port = port or env_params.get('port', 5439)
     
     # Validate required parameters
-    if not all([host, database, user, password]):
-        missing = []
-        if not host: missing.append('host (or REDSHIFT_HOST env var)')
-        if not database: missing.append('database (or REDSHIFT_DATABASE env var)')
-        if not user: missing.append('user (or REDSHIFT_USER env var)')
-        if not password: missing.append('password (or REDSHIFT_PASSWORD env var)')
-        
+    required = (
+        ('host', 'REDSHIFT_HOST', host),
+        ('database', 'REDSHIFT_DATABASE', database),
+        ('user', 'REDSHIFT_USER', user),
+        ('password', 'REDSHIFT_PASSWORD', password)
+    )
+    missing = [f"{name} (or {env_var} env var)" for name, env_var, value in required if not value]
+    if missing:
         return {
             "status": "error",
             "error": f"Missing required parameters: {', '.join(missing)}"
         }
     
     try:
-        # Close existing connection if any
-        if connection_state.conn:
-            connection_state.conn.close()
+        # Close existing pool if any
+        if connection_state.pool:
+            pool, connection_state.pool = connection_state.pool, None
+            await run_db(pool.closeall)
         
-        # Create new connection
-        connection_state.conn = redshift_connector.connect(
+        # Create new pool and open its first connection to validate the credentials
+        pool = ConnectionPool(dict(
             host=host,
             database=database,
             user=user,
             password=password,
             port=port
-        )
-        connection_state.cursor = connection_state.conn.cursor()
+        ))
+        async with pool.acquire() as conn:
+            rowcount_supported = hasattr(make_cursor(conn), 'rowcount')
+        _HAS_ROWCOUNT = rowcount_supported
+        connection_state.pool = pool
         connection_state.host = host
         connection_state.database = database
         connection_state.user = user
@@ -192,50 +942,69 @@ async def connect_db(
         }
 
 @mcp.tool()
-async def query(sql: str, params: Optional[List[Any]] = None) -> Dict[str, Any]:
+async def query(
+    sql: str,
+    params: Optional[List[Any]] = None,
+    max_rows: Optional[int] = None,
+    format: str = "rows"
+) -> Dict[str, Any]:
     """
     Execute a SELECT query on the Redshift database.
     
     Args:
         sql: SQL query to execute
         params: Optional query parameters for prepared statements
+        max_rows: Optional maximum number of rows to return; "truncated" is set when more were
+            available. Only max_rows + 1 rows are fetched, through a server-side cursor
+        format: "rows" (default) returns one dictionary per row; "columnar" returns one
+            list of values per column, in the same order as "columns"
     
     Returns:
-        Query results as list of dictionaries
+        Query results as list of dictionaries, or as per-column value lists
     """
     mode = get_mcp_mode()
     forbidden_reason = is_forbidden(sql, mode)
     if forbidden_reason:
         return {"status": "error", "error": forbidden_reason}
-    if not connection_state.conn:
-        # Try auto-connect if not connected
-        await auto_connect()
-        if not connection_state.conn:
-            return {"error": "Not connected to database. Use connect_db or set environment variables."}
+    if max_rows is not None and max_rows < 0:
+        return {"status": "error", "error": "max_rows must be zero or greater."}
+    if format not in QUERY_FORMATS:
+        return {"status": "error", "error": f"Unknown format '{format}'. Use one of: {', '.join(sorted(QUERY_FORMATS))}."}
+    if (error := await ensure_connected()):
+        return error
     
     try:
-        cursor = connection_state.cursor
+        pool = connection_state.pool
+        async with pool.acquire() as conn:
+            columns, rows = await pool.run(
+                conn, fetch_query_rows, conn, pool.statements(conn), sql, params, max_rows,
+                format == "rows"
+            )
         
-        # Execute query with or without parameters
-        if params:
-            cursor.execute(sql, params)
-        else:
-            cursor.execute(sql)
+        # Admin mode lets DDL through query too, and schema changes make cached metadata stale
+        if first_keyword(sql) in DDL_COMMANDS:
+            await invalidate_metadata_cache()
         
-        # Fetch results
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        truncated = max_rows is not None and len(rows) > max_rows
+        if truncated:
+            del rows[max_rows:]
         
-        # Convert to list of dictionaries
-        results = []
-        for row in rows:
-            results.append(dict(zip(columns, row)))
+        if format == "columnar":
+            # One list per column instead of repeating every column name per row
+            results = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+        elif DRIVER == 'psycopg2':
+            # psycopg2 already returned each row as a dictionary
+            results = rows
+        else:
+            # Convert to list of dictionaries
+            results = [dict(zip(columns, row)) for row in rows]
         
         return {
             "status": "success",
-            "row_count": len(results),
+            "row_count": len(rows),
             "columns": columns,
-            "data": results
+            "data": results,
+            "truncated": truncated
         }
     except Exception as e:
         logger.error(f"Query failed: {str(e)}")
@@ -244,6 +1013,59 @@ async def query(sql: str, params: Optional[List[Any]] = None) -> Dict[str, Any]:
             "error": str(e)
         }
 
+async def query_stream(
+    sql: str,
+    params: Optional[List[Any]] = None,
+    chunk_size: int = QUERY_FETCH_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the results of a SELECT query in chunks, for in-process callers.
+    
+    Rows are read through a server-side cursor (see ResultStream), so the first rows are
+    available before the rest are fetched and only the current chunk is held in Python.
+    With redshift_connector this holds for queries without params only. MCP tool results
+    are single messages, so this is not registered as a tool; over MCP use query with
+    max_rows and/or format="columnar".
+    
+    Args:
+        sql: SQL query to execute
+        params: Optional query parameters
+        chunk_size: Maximum number of rows per chunk
+    
+    Yields:
+        One {"status": "success", "columns": [...], "rows": [...]} dictionary per chunk,
+        or a single error response
+    """
+    mode = get_mcp_mode()
+    forbidden_reason = is_forbidden(sql, mode)
+    if forbidden_reason:
+        yield {"status": "error", "error": forbidden_reason}
+        return
+    if chunk_size < 1:
+        yield {"status": "error", "error": "chunk_size must be at least 1."}
+        return
+    if (error := await ensure_connected()):
+        yield error
+        return
+    
+    stopped = False
+    try:
+        pool = connection_state.pool
+        async with pool.acquire() as conn:
+            stream = await pool.run(conn, ResultStream, conn, pool.statements(conn), sql, params)
+            while (batch := await pool.run(conn, stream.fetch, chunk_size)):
+                try:
+                    yield {"status": "success", "columns": stream.columns, "rows": batch}
+                except GeneratorExit:
+                    # Caller stopped early; nothing more may be yielded
+                    stopped = True
+                    break
+            await pool.run(conn, stream.close)
+    except Exception as e:
+        logger.error(f"Query stream failed: {str(e)}")
+        if not stopped:
+            yield {"status": "error", "error": str(e)}
+
 @mcp.tool()
 async def execute(sql: str, params: Optional[List[Any]] = None) -> Dict[str, Any]:
     """
@@ -251,7 +1073,9 @@ async def execute(sql: str, params: Optional[List[Any]] = None) -> Dict[str, Any
     
     Args:
         sql: SQL statement to execute
-        params: Optional parameters for prepared statements
+        params: Optional parameters for prepared statements. Pass a list of parameter
+            lists (one per row) to run the statement for many rows in batched round trips;
+            rows_affected is -1 when the driver cannot report a total
     
     Returns:
         Execution status and affected rows
@@ -260,32 +1084,27 @@ async def execute(sql: str, params: Optional[List[Any]] = None) -> Dict[str, Any
     forbidden_reason = is_forbidden(sql, mode)
     if forbidden_reason:
         return {"status": "error", "error": forbidden_reason}
-    if not connection_state.conn:
-        # Try auto-connect if not connected
-        await auto_connect()
-        if not connection_state.conn:
-            return {"error": "Not connected to database. Use connect_db or set environment variables."}
+    if (error := await ensure_connected()):
+        return error
     
     try:
-        cursor = connection_state.cursor
-        
-        # Execute statement
-        if params:
-            cursor.execute(sql, params)
-        else:
-            cursor.execute(sql)
+        pool = connection_state.pool
+        async with pool.acquire() as conn:
+            if params and isinstance(params[0], (list, tuple)):
+                rows_affected = await pool.run(conn, run_batch, conn, sql, params)
+            else:
+                rows_affected = await pool.run(conn, run_statement, conn, pool.statements(conn), sql, params)
         
-        # Commit the transaction
-        connection_state.conn.commit()
+        # Schema changes make cached metadata stale
+        if first_keyword(sql) in DDL_COMMANDS:
+            await invalidate_metadata_cache()
         
         return {
             "status": "success",
-            "rows_affected": cursor.rowcount if hasattr(cursor, 'rowcount') else -1
+            "rows_affected": rows_affected
         }
     except Exception as e:
-        # Rollback on error
-        if connection_state.conn:
-            connection_state.conn.rollback()
+        # acquire() rolls the connection back before returning it to the pool
         logger.error(f"Execute failed: {str(e)}")
         return {
             "status": "error",
@@ -300,27 +1119,26 @@ async def list_schemas() -> Dict[str, Any]:
     Returns:
         List of schema names
     """
-    if not connection_state.conn:
-        # Try auto-connect if not connected
-        await auto_connect()
-        if not connection_state.conn:
-            return {"error": "Not connected to database. Use connect_db or set environment variables."}
+    if (error := await ensure_connected()):
+        return error
+    
+    cache_key = metadata_cache_key("list_schemas")
+    cached = get_cached_metadata(cache_key)
+    if cached is not None:
+        return cached
+    generation = metadata_generation()
     
     try:
-        cursor = connection_state.cursor
-        cursor.execute("""
-            SELECT schema_name 
-            FROM information_schema.schemata 
-            WHERE schema_name NOT IN ('pg_catalog', 'information_schema')
-            ORDER BY schema_name
-        """)
+        pool = connection_state.pool
+        async with pool.acquire() as conn:
+            rows = await pool.run(conn, fetch_prepared, conn, pool.prepared(conn), _SQL_LIST_SCHEMAS)
         
-        schemas = [row[0] for row in cursor.fetchall()]
+        schemas = [row[0] for row in rows]
         
-        return {
+        return cache_metadata(cache_key, {
             "status": "success",
             "schemas": schemas
-        }
+        }, generation)
     except Exception as e:
         logger.error(f"List schemas failed: {str(e)}")
         return {
@@ -339,29 +1157,29 @@ async def list_tables(schema: str = "public") -> Dict[str, Any]:
     Returns:
         List of table names in the schema
     """
-    if not connection_state.conn:
-        # Try auto-connect if not connected
-        await auto_connect()
-        if not connection_state.conn:
-            return {"error": "Not connected to database. Use connect_db or set environment variables."}
+    if (error := await ensure_connected()):
+        return error
+    
+    cache_key = metadata_cache_key("list_tables", schema)
+    cached = get_cached_metadata(cache_key)
+    if cached is not None:
+        return cached
+    generation = metadata_generation()
     
     try:
-        cursor = connection_state.cursor
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = %s 
-            AND table_type = 'BASE TABLE'
-            ORDER BY table_name
-        """, (schema,))
+        pool = connection_state.pool
+        async with pool.acquire() as conn:
+            rows = await pool.run(
+                conn, fetch_prepared, conn, pool.prepared(conn), _SQL_LIST_TABLES, (schema,)
+            )
         
-        tables = [row[0] for row in cursor.fetchall()]
+        tables = [row[0] for row in rows]
         
-        return {
+        return cache_metadata(cache_key, {
             "status": "success",
             "schema": schema,
             "tables": tables
-        }
+        }, generation)
     except Exception as e:
         logger.error(f"List tables failed: {str(e)}")
         return {
@@ -381,30 +1199,24 @@ async def describe_table(table: str, schema: str = "public") -> Dict[str, Any]:
     Returns:
         Table structure including columns, types, and constraints
     """
-    if not connection_state.conn:
-        # Try auto-connect if not connected
-        await auto_connect()
-        if not connection_state.conn:
-            return {"error": "Not connected to database. Use connect_db or set environment variables."}
+    if (error := await ensure_connected()):
+        return error
+    
+    cache_key = metadata_cache_key("describe_table", schema, table)
+    cached = get_cached_metadata(cache_key)
+    if cached is not None:
+        return cached
+    generation = metadata_generation()
     
     try:
-        cursor = connection_state.cursor
-        cursor.execute("""
-            SELECT 
-                column_name,
-                data_type,
-                character_maximum_length,
-                numeric_precision,
-                numeric_scale,
-                is_nullable,
-                column_default
-            FROM information_schema.columns
-            WHERE table_schema = %s AND table_name = %s
-            ORDER BY ordinal_position
-        """, (schema, table))
+        pool = connection_state.pool
+        async with pool.acquire() as conn:
+            rows = await pool.run(
+                conn, fetch_prepared, conn, pool.prepared(conn), _SQL_DESCRIBE_TABLE, (schema, table)
+            )
         
         columns = []
-        for row in cursor.fetchall():
+        for row in rows:
             col_info = {
                 "name": row[0],
                 "type": row[1],
@@ -422,12 +1234,12 @@ async def describe_table(table: str, schema: str = "public") -> Dict[str, Any]:
             
             columns.append(col_info)
         
-        return {
+        return cache_metadata(cache_key, {
             "status": "success",
             "schema": schema,
             "table": table,
             "columns": columns
-        }
+        }, generation)
     except Exception as e:
         logger.error(f"Describe table failed: {str(e)}")
         return {
@@ -435,6 +1247,26 @@ async def describe_table(table: str, schema: str = "public") -> Dict[str, Any]:
             "error": str(e)
         }
 
+@mcp.tool()
+async def invalidate_metadata_cache() -> Dict[str, Any]:
+    """
+    Clear cached schema, table and column metadata, and the server-side prepared statements
+    whose plans may predate a schema change.
+    
+    Called automatically after CREATE, DROP, ALTER and TRUNCATE statements run through
+    execute or query.
+    
+    Returns:
+        Number of cache entries cleared
+    """
+    global _metadata_generation
+    if connection_state.pool:
+        connection_state.pool.invalidate_statements()
+    _metadata_generation += 1
+    cleared = len(_metadata_cache)
+    _metadata_cache.clear()
+    return {"status": "success", "cleared": cleared}
+
 @mcp.tool()
 async def disconnect() -> Dict[str, str]:
     """
@@ -443,16 +1275,14 @@ async def disconnect() -> Dict[str, str]:
     Returns:
         Disconnection status
     """
-    global connection_state
-    
     try:
-        if connection_state.conn:
-            connection_state.conn.close()
-            connection_state.conn = None
-            connection_state.cursor = None
+        if connection_state.pool:
+            pool, connection_state.pool = connection_state.pool, None
+            await run_db(pool.closeall)
             connection_state.host = None
             connection_state.database = None
             connection_state.user = None
+        await invalidate_metadata_cache()
         
         return {"status": "disconnected"}
     except Exception as e:
@@ -462,7 +1292,6 @@ async def disconnect() -> Dict[str, str]:
 # Main entry point
 if __name__ == "__main__":
     # Try auto-connect when running directly
-    import asyncio
     asyncio.run(auto_connect())
     
     # Run the server
@@ -0,0 +1,94 @@
+"""
+Unit tests for execute() batching using a recording stand-in for driver connections.
+"""
+import pytest
+
+from src import redshift_mcp_server as server
+
+
+class FakeCursor:
+    """Records statements; rowcount is the number of VALUES rows in the last INSERT."""
+
+    def __init__(self):
+        self.executed = []
+        self.many = []
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self.rowcount = sql.count("(%s")
+
+    def executemany(self, sql, rows):
+        self.many.append((sql, rows))
+        self.rowcount = len(rows)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursor_obj = FakeCursor()
+        self.commits = 0
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.parametrize("sql, prefix, template", [
+    ("INSERT INTO t (a, b) VALUES (%s, %s)", "INSERT INTO t (a, b) VALUES ", "(%s, %s)"),
+    ("insert into t values(%s)", "insert into t values", "(%s)"),
+    ("  INSERT INTO s.t (a)\n VALUES (%s);  ", "  INSERT INTO s.t (a)\n VALUES ", "(%s)"),
+])
+def test_insert_values_re_matches_single_row_inserts(sql, prefix, template):
+    assert server._INSERT_VALUES_RE.match(sql).groups() == (prefix, template)
+
+
+@pytest.mark.parametrize("sql", [
+    "INSERT INTO t VALUES (now(), %s)",
+    "INSERT INTO t SELECT %s",
+    "INSERT INTO t VALUES (%s) RETURNING a",
+    "UPDATE t SET a = %s",
+])
+def test_insert_values_re_rejects_other_statements(sql):
+    assert server._INSERT_VALUES_RE.match(sql) is None
+
+
+def test_run_batch_pages_multi_row_insert(monkeypatch):
+    monkeypatch.setattr(server, "BATCH_PAGE_SIZE", 2)
+    conn = FakeConnection()
+
+    rowcount = server.run_batch(conn, "INSERT INTO t (a, b) VALUES (%s, %s)", [[1, "x"], [2, "y"], [3, "z"]])
+
+    assert conn.cursor_obj.executed == [
+        ("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)", [1, "x", 2, "y"]),
+        ("INSERT INTO t (a, b) VALUES (%s, %s)", [3, "z"]),
+    ]
+    assert rowcount == 3
+    assert conn.commits == 1
+
+
+def test_run_batch_keeps_wide_pages_within_bind_parameter_limit():
+    columns = 40
+    conn = FakeConnection()
+    template = ", ".join(["%s"] * columns)
+    rows = [[row] * columns for row in range(1000)]
+
+    rowcount = server.run_batch(conn, f"INSERT INTO wide VALUES ({template})", rows)
+
+    pages = conn.cursor_obj.executed
+    assert all(len(params) <= server.MAX_BIND_PARAMETERS for _, params in pages)
+    assert sum(len(params) for _, params in pages) == 1000 * columns
+    assert rowcount == 1000
+
+
+def test_run_batch_falls_back_to_executemany(monkeypatch):
+    monkeypatch.setattr(server, "DRIVER", "redshift_connector")
+    conn = FakeConnection()
+    rows = [[1, "x"], [2, "y"]]
+
+    rowcount = server.run_batch(conn, "UPDATE t SET a = %s WHERE b = %s", rows)
+
+    assert conn.cursor_obj.many == [("UPDATE t SET a = %s WHERE b = %s", rows)]
+    assert rowcount == 2
+    assert conn.commits == 1
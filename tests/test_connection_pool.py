@@ -0,0 +1,170 @@
+"""
+Unit tests for ConnectionPool using in-memory stand-ins for driver connections.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from src import redshift_mcp_server as server
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        # Like both drivers, any statement implicitly opens a transaction
+        self.conn.in_transaction = True
+
+
+class FakeConnection:
+    """Minimal driver connection tracking its transaction and close() calls."""
+
+    def __init__(self, fail_commit=False):
+        self.closed = False
+        self.closed_on = None
+        self.in_transaction = False
+        self.fail_commit = fail_commit
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        if self.fail_commit:
+            raise Exception("commit failed")
+        self.in_transaction = False
+
+    def rollback(self):
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+        self.closed_on = threading.current_thread()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(server, "open_connection", lambda params: FakeConnection())
+    pool = server.ConnectionPool({}, maxconn=1)
+    yield pool
+    pool.closeall()
+
+
+def test_acquire_reuses_connection(pool):
+    async def scenario():
+        async with pool.acquire() as first:
+            pass
+        async with pool.acquire() as second:
+            pass
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert (pool._size, len(pool._idle)) == (1, 1)
+
+
+def test_returned_connection_has_no_open_transaction(pool):
+    async def scenario():
+        async with pool.acquire() as conn:
+            await pool.run(conn, conn.cursor().execute, "SELECT 1")
+            assert conn.in_transaction
+        return conn
+
+    conn = asyncio.run(scenario())
+    assert pool._idle == [conn]
+    assert not conn.in_transaction
+
+
+def test_connection_failing_to_commit_is_closed(monkeypatch):
+    monkeypatch.setattr(server, "open_connection", lambda params: FakeConnection(fail_commit=True))
+    pool = server.ConnectionPool({}, maxconn=1)
+
+    async def scenario():
+        async with pool.acquire() as conn:
+            pass
+        return conn
+
+    conn = asyncio.run(scenario())
+    assert conn.closed
+    assert (pool._size, pool._idle) == (0, [])
+
+
+def test_connection_returned_to_closed_pool_is_closed_off_the_event_loop(pool):
+    async def scenario():
+        async with pool.acquire() as conn:
+            # e.g. connect_db or disconnect replaced the pool meanwhile
+            await server.run_db(pool.closeall)
+        return conn
+
+    conn = asyncio.run(scenario())
+    assert conn.closed
+    assert conn.closed_on is not threading.main_thread()
+    assert (pool._size, pool._idle) == (0, [])
+
+
+def test_cancelled_waiter_returns_connection(pool):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def holder():
+            async with pool.acquire():
+                await release.wait()
+
+        holding = asyncio.create_task(holder())
+        await asyncio.sleep(0.05)
+
+        # Blocks in getconn() until the holder releases, then gets cancelled
+        waiter = asyncio.create_task(pool.acquire().__aenter__())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        release.set()
+        await holding
+
+        # The connection getconn() handed to the cancelled waiter must come back
+        async def acquire_again():
+            async with pool.acquire():
+                pass
+
+        await asyncio.wait_for(acquire_again(), timeout=2)
+
+    asyncio.run(scenario())
+    assert pool._size == 1
+
+
+def test_cancelled_call_closes_connection_after_it_finishes(pool):
+    finish = threading.Event()
+    checked_out = []
+
+    async def scenario():
+        async def caller():
+            async with pool.acquire() as conn:
+                checked_out.append(conn)
+                await pool.run(conn, finish.wait)
+
+        task = asyncio.create_task(caller())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # A worker thread is still inside the call: the connection stays open and counted
+        await asyncio.sleep(0.05)
+        conn, = checked_out
+        assert not conn.closed
+        assert pool._size == 1
+
+        finish.set()
+        for _ in range(200):
+            if conn.closed:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    conn, = checked_out
+    assert conn.closed
+    assert conn.closed_on is not threading.main_thread()
+    assert (pool._size, pool._idle) == (0, [])
@@ -0,0 +1,113 @@
+"""
+Unit tests for the metadata cache behind list_schemas, list_tables and describe_table.
+"""
+import asyncio
+import threading
+import types
+
+import pytest
+
+from src import redshift_mcp_server as server
+
+
+class FakeConnection:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connected(monkeypatch):
+    """A pool of fake connections, fake catalog rows and an empty cache; returns the catalog lookups made."""
+    monkeypatch.setattr(server, "open_connection", lambda params: FakeConnection())
+    monkeypatch.setattr(server, "_metadata_cache", {})
+    pool = server.ConnectionPool({}, maxconn=2)
+    monkeypatch.setattr(server.connection_state, "pool", pool)
+
+    lookups = []
+    rows = {
+        "mcp_list_schemas": [("public",)],
+        "mcp_list_tables": [("users",)],
+        "mcp_describe_table": [("id", "integer", None, 32, 0, "NO", None)],
+    }
+
+    def fetch_prepared(conn, prepared, statement, params=()):
+        lookups.append(statement.name)
+        return rows[statement.name]
+
+    monkeypatch.setattr(server, "fetch_prepared", fetch_prepared)
+    yield lookups
+    pool.closeall()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(server, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_lookup_is_served_from_cache_until_ttl_expires(connected, clock, monkeypatch):
+    monkeypatch.setattr(server, "METADATA_CACHE_TTL", 60)
+
+    first = asyncio.run(server.list_tables("public"))
+    clock[0] += 59
+    second = asyncio.run(server.list_tables("public"))
+    clock[0] += 1
+    asyncio.run(server.list_tables("public"))
+
+    assert first == second == {"status": "success", "schema": "public", "tables": ["users"]}
+    assert connected == ["mcp_list_tables", "mcp_list_tables"]
+
+
+def test_zero_ttl_disables_cache(connected, monkeypatch):
+    monkeypatch.setattr(server, "METADATA_CACHE_TTL", 0)
+
+    asyncio.run(server.list_schemas())
+    asyncio.run(server.list_schemas())
+
+    assert connected == ["mcp_list_schemas", "mcp_list_schemas"]
+    assert not server._metadata_cache
+
+
+@pytest.mark.parametrize("tool", ["execute", "query"])
+def test_ddl_invalidates_cache(connected, monkeypatch, tool):
+    monkeypatch.setattr(server, "_MCP_MODE", "admin")
+    monkeypatch.setattr(server, "run_statement", lambda conn, statements, sql, params: 0)
+    monkeypatch.setattr(server, "fetch_query_rows", lambda conn, statements, sql, params, max_rows, dict_rows: ([], []))
+
+    async def scenario():
+        await server.describe_table("users")
+        await server.describe_table("users")
+        result = await getattr(server, tool)("DROP TABLE users")
+        await server.describe_table("users")
+        return result
+
+    assert asyncio.run(scenario())["status"] == "success"
+    assert connected == ["mcp_describe_table", "mcp_describe_table"]
+
+
+def test_lookup_started_before_invalidation_is_not_stored(connected, monkeypatch):
+    started, finish = threading.Event(), threading.Event()
+
+    def slow_fetch_prepared(conn, prepared, statement, params=()):
+        started.set()
+        finish.wait(timeout=5)
+        return [("users",)]
+
+    monkeypatch.setattr(server, "fetch_prepared", slow_fetch_prepared)
+
+    async def scenario():
+        lookup = asyncio.create_task(server.list_tables("public"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        await server.invalidate_metadata_cache()
+        finish.set()
+        return await lookup
+
+    assert asyncio.run(scenario())["status"] == "success"
+    assert not server._metadata_cache
@@ -0,0 +1,222 @@
+"""
+Unit tests for prepared statement handling using a recording stand-in for driver cursors.
+"""
+from collections import OrderedDict
+
+import asyncio
+
+import pytest
+
+from src import redshift_mcp_server as server
+
+
+class FakeCursor:
+    """Records executed statements; raises for statements starting with any prefix in fail_on."""
+
+    def __init__(self, fail_on=()):
+        self.executed = []
+        self.fail_on = fail_on
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql.strip(), params))
+        if sql.strip().startswith(self.fail_on):
+            raise Exception("statement failed")
+
+
+class FakeConnection:
+    def __init__(self, cursor=None):
+        self.rollbacks = 0
+        self.cursor_obj = cursor
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def client_side_params(monkeypatch):
+    monkeypatch.setattr(server, "PREPARED_EXECUTE", True)
+
+
+@pytest.fixture
+def server_side_params(monkeypatch):
+    monkeypatch.setattr(server, "PREPARED_EXECUTE", False)
+
+
+def test_execute_prepared_prepares_once(client_side_params):
+    conn, cursor = FakeConnection(), FakeCursor()
+    prepared = set()
+
+    for _ in range(2):
+        server.execute_prepared(conn, cursor, prepared, server._SQL_DESCRIBE_TABLE, ("public", "users"))
+
+    prepare, first, second = cursor.executed
+    assert prepare[0].startswith("PREPARE mcp_describe_table(varchar, varchar) AS")
+    assert "table_schema = $1 AND table_name = $2" in prepare[0]
+    assert first == second == ("EXECUTE mcp_describe_table(%s, %s)", ("public", "users"))
+    assert prepared == {"mcp_describe_table"}
+
+
+def test_execute_prepared_without_prepared_execute_runs_plain_query(server_side_params):
+    conn, cursor = FakeConnection(), FakeCursor()
+    prepared = set()
+
+    server.execute_prepared(conn, cursor, prepared, server._SQL_LIST_TABLES, ("public",))
+    server.execute_prepared(conn, cursor, prepared, server._SQL_LIST_SCHEMAS)
+
+    (tables_sql, tables_params), (schemas_sql, schemas_params) = cursor.executed
+    assert tables_sql == server._SQL_LIST_TABLES.sql.strip()
+    assert tables_params == ("public",)
+    assert schemas_sql == server._SQL_LIST_SCHEMAS.sql.strip()
+    assert schemas_params is None
+    assert not prepared
+
+
+def test_execute_prepared_forgets_statement_when_execute_fails(client_side_params):
+    conn, cursor = FakeConnection(), FakeCursor(fail_on=("EXECUTE",))
+    prepared = set()
+
+    with pytest.raises(Exception):
+        server.execute_prepared(conn, cursor, prepared, server._SQL_LIST_SCHEMAS)
+
+    assert cursor.executed[-1] == ("DEALLOCATE mcp_list_schemas", None)
+    assert conn.rollbacks == 1
+    assert not prepared
+
+
+@pytest.mark.parametrize("sql, argc, expected", [
+    ("SELECT * FROM t WHERE a = %s", 1, "SELECT * FROM t WHERE a = $1"),
+    ("SELECT * FROM t WHERE a = %s AND b = %s", 2, "SELECT * FROM t WHERE a = $1 AND b = $2"),
+    ("SELECT * FROM t WHERE a LIKE 'x%%' AND b = %s", 1, "SELECT * FROM t WHERE a LIKE 'x%' AND b = $1"),
+    ("SELECT * FROM t WHERE a = %(a)s", 1, None),
+    ("SELECT * FROM t WHERE a = %d", 1, None),
+    ("SELECT * FROM t WHERE a = %s", 2, None),
+    ("SELECT * FROM t WHERE a = $1 OR a = %s", 1, None),
+    ("SELECT 100%", 0, None),
+])
+def test_to_positional_placeholders(sql, argc, expected):
+    assert server.to_positional_placeholders(sql, argc) == expected
+
+
+def test_prepare_cached_prepares_on_miss_and_reuses_on_hit():
+    conn, cursor = FakeConnection(), FakeCursor()
+    statements = OrderedDict()
+    sql = "SELECT * FROM t WHERE a = %s"
+
+    first = server.prepare_cached(conn, cursor, statements, sql, 1)
+    second = server.prepare_cached(conn, cursor, statements, sql, 1)
+
+    assert first == second
+    assert first.startswith("mcp_")
+    assert cursor.executed == [(f"PREPARE {first} AS SELECT * FROM t WHERE a = $1", None)]
+
+
+def test_prepare_cached_deallocates_least_recently_used(monkeypatch):
+    monkeypatch.setattr(server, "STATEMENT_CACHE_SIZE", 2)
+    conn, cursor = FakeConnection(), FakeCursor()
+    statements = OrderedDict()
+
+    a = server.prepare_cached(conn, cursor, statements, "SELECT a FROM t WHERE x = %s", 1)
+    b = server.prepare_cached(conn, cursor, statements, "SELECT b FROM t WHERE x = %s", 1)
+    server.prepare_cached(conn, cursor, statements, "SELECT a FROM t WHERE x = %s", 1)
+    server.prepare_cached(conn, cursor, statements, "SELECT c FROM t WHERE x = %s", 1)
+
+    assert cursor.executed[-1] == (f"DEALLOCATE {b}", None)
+    assert list(statements) == ["SELECT a FROM t WHERE x = %s", "SELECT c FROM t WHERE x = %s"]
+    assert statements["SELECT a FROM t WHERE x = %s"] == a
+
+
+def test_prepare_cached_remembers_failed_prepare():
+    conn, cursor = FakeConnection(), FakeCursor(fail_on=("PREPARE",))
+    statements = OrderedDict()
+    sql = "SELECT %s"
+
+    assert server.prepare_cached(conn, cursor, statements, sql, 1) is None
+    assert server.prepare_cached(conn, cursor, statements, sql, 1) is None
+    assert conn.rollbacks == 1
+    assert len(cursor.executed) == 1
+
+
+@pytest.mark.parametrize("sql, argc", [
+    ("CREATE TABLE t AS SELECT %s", 1),
+    ("SELECT * FROM t WHERE a = %(a)s", 1),
+    ("SELECT * FROM t WHERE a = %s", 2),
+])
+def test_prepare_cached_skips_unpreparable_statements(sql, argc):
+    conn, cursor = FakeConnection(), FakeCursor()
+    statements = OrderedDict()
+
+    assert server.prepare_cached(conn, cursor, statements, sql, argc) is None
+    assert cursor.executed == []
+    assert statements == {sql: None}
+
+
+def test_execute_statement_uses_prepared_plan(client_side_params):
+    conn, cursor = FakeConnection(), FakeCursor()
+    statements = OrderedDict()
+
+    server.execute_statement(conn, cursor, statements, "SELECT * FROM t WHERE a = %s", [1])
+
+    name = statements["SELECT * FROM t WHERE a = %s"]
+    assert cursor.executed[-1] == (f"EXECUTE {name}(%s)", [1])
+
+
+def test_execute_statement_without_prepared_execute_binds_directly(server_side_params):
+    conn, cursor = FakeConnection(), FakeCursor()
+    statements = OrderedDict()
+
+    server.execute_statement(conn, cursor, statements, "SELECT * FROM t WHERE a = %s", [1])
+
+    assert cursor.executed == [("SELECT * FROM t WHERE a = %s", [1])]
+    assert not statements
+
+
+def test_execute_statement_without_params_runs_directly(client_side_params):
+    conn, cursor = FakeConnection(), FakeCursor()
+    statements = OrderedDict()
+
+    server.execute_statement(conn, cursor, statements, "SELECT 1", None)
+
+    assert cursor.executed == [("SELECT 1", None)]
+    assert not statements
+
+
+def test_execute_statement_forgets_plan_when_execute_fails(client_side_params):
+    conn, cursor = FakeConnection(), FakeCursor(fail_on=("EXECUTE", "DEALLOCATE"))
+    statements = OrderedDict()
+    sql = "SELECT * FROM t WHERE a = %s"
+
+    with pytest.raises(Exception):
+        server.execute_statement(conn, cursor, statements, sql, [1])
+
+    # The stale plan is dropped, even though the best-effort DEALLOCATE failed too
+    name = cursor.executed[0][0].split()[1]
+    assert cursor.executed[-1] == (f"DEALLOCATE {name}", None)
+    assert conn.rollbacks == 2
+    assert not statements
+
+
+def test_invalidated_connection_deallocates_before_reuse(client_side_params, monkeypatch):
+    cursor = FakeCursor()
+    monkeypatch.setattr(server, "open_connection", lambda params: FakeConnection(cursor))
+    pool = server.ConnectionPool({}, maxconn=1)
+
+    async def scenario():
+        async with pool.acquire() as conn:
+            statements = pool.statements(conn)
+            await pool.run(conn, server.execute_statement, conn, cursor, statements, "SELECT %s", [1])
+        pool.invalidate_statements()
+        async with pool.acquire() as again:
+            assert again is conn
+        return statements
+
+    statements = asyncio.run(scenario())
+    assert cursor.executed[-1] == ("DEALLOCATE ALL", None)
+    assert not statements
+    assert not pool._stale
+    pool.closeall()
@@ -0,0 +1,167 @@
+"""
+Unit tests for ResultStream and query_stream using recording stand-ins for driver cursors.
+"""
+import asyncio
+import re
+from collections import OrderedDict
+
+import pytest
+
+from src import redshift_mcp_server as server
+
+
+class FakeCursor:
+    """
+    Serves ``rows`` through FETCH FORWARD n, or fetchmany() once executed.
+
+    Records executed statements and the client-side name it was opened with.
+    """
+
+    def __init__(self, rows, name=None):
+        self.rows = list(rows)
+        self.name = name
+        self.executed = []
+        self.description = None
+        self.pending = []
+        self.closed = False
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        fetch = re.match(r"FETCH FORWARD (\d+) FROM", sql)
+        if fetch:
+            self.pending = self.take(int(fetch.group(1)))
+        elif sql.startswith("SELECT") and self.name is None:
+            self.description = [("id",)]
+
+    def take(self, size):
+        self.description = [("id",)]
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def fetchall(self):
+        batch, self.pending = self.pending, []
+        return batch
+
+    def fetchmany(self, size):
+        return self.take(size)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.cursors = []
+        self.rows = rows
+
+    def cursor(self, name=None, cursor_factory=None):
+        cursor = FakeCursor(self.rows, name)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+ROWS = [(1,), (2,), (3,)]
+
+
+def read_all(stream, size=2):
+    chunks = []
+    while (batch := stream.fetch(size)):
+        chunks.append(batch)
+    stream.close()
+    return chunks
+
+
+def test_redshift_connector_declares_cursor(monkeypatch):
+    monkeypatch.setattr(server, "DRIVER", "redshift_connector")
+    conn = FakeConnection(ROWS)
+
+    stream = server.ResultStream(conn, OrderedDict(), "SELECT id FROM t;")
+
+    assert read_all(stream) == [[(1,), (2,)], [(3,)]]
+    assert stream.columns == ["id"]
+    cursor, = conn.cursors
+    assert [sql for sql, _ in cursor.executed] == [
+        "DECLARE mcp_stream CURSOR FOR SELECT id FROM t",
+        "FETCH FORWARD 2 FROM mcp_stream",
+        "FETCH FORWARD 2 FROM mcp_stream",
+        "FETCH FORWARD 2 FROM mcp_stream",
+        "CLOSE mcp_stream",
+    ]
+    assert cursor.closed
+
+
+def test_redshift_connector_with_params_uses_ordinary_cursor(monkeypatch):
+    monkeypatch.setattr(server, "DRIVER", "redshift_connector")
+    monkeypatch.setattr(server, "PREPARED_EXECUTE", False)
+    conn = FakeConnection(ROWS)
+
+    stream = server.ResultStream(conn, OrderedDict(), "SELECT id FROM t WHERE id > %s", [0])
+
+    assert read_all(stream) == [[(1,), (2,)], [(3,)]]
+    cursor, = conn.cursors
+    assert cursor.executed == [("SELECT id FROM t WHERE id > %s", [0])]
+
+
+def test_psycopg2_uses_named_cursor(monkeypatch):
+    monkeypatch.setattr(server, "DRIVER", "psycopg2")
+    conn = FakeConnection(ROWS)
+
+    stream = server.ResultStream(conn, OrderedDict(), "SELECT id FROM t WHERE id > %s", [0])
+
+    assert read_all(stream, size=5) == [ROWS]
+    assert stream.columns == ["id"]
+    cursor, = conn.cursors
+    assert cursor.name == "mcp_stream"
+    assert cursor.executed == [("SELECT id FROM t WHERE id > %s", [0])]
+
+
+def test_statement_without_rows_fetches_nothing(monkeypatch):
+    monkeypatch.setattr(server, "DRIVER", "redshift_connector")
+    conn = FakeConnection([])
+
+    stream = server.ResultStream(conn, OrderedDict(), "VACUUM t")
+
+    assert stream.fetch(10) == []
+    assert stream.columns == []
+
+
+def test_query_stream_closes_cursor_when_caller_stops(monkeypatch):
+    monkeypatch.setattr(server, "DRIVER", "redshift_connector")
+    conn = FakeConnection(ROWS)
+    monkeypatch.setattr(server, "open_connection", lambda params: conn)
+    pool = server.ConnectionPool({}, maxconn=1)
+    monkeypatch.setattr(server.connection_state, "pool", pool)
+
+    async def scenario():
+        chunks = server.query_stream("SELECT id FROM t", chunk_size=1)
+        first = await chunks.__anext__()
+        await chunks.aclose()
+        return first
+
+    assert asyncio.run(scenario()) == {"status": "success", "columns": ["id"], "rows": [(1,)]}
+    cursor, = conn.cursors
+    assert cursor.executed[-1] == ("CLOSE mcp_stream", None)
+    assert cursor.closed
+    assert (pool._size, len(pool._idle)) == (1, 1)
+    pool.closeall()
+
+
+def test_fetch_query_rows_reads_only_max_rows_plus_one(monkeypatch):
+    monkeypatch.setattr(server, "DRIVER", "redshift_connector")
+    conn = FakeConnection([(n,) for n in range(10)])
+
+    columns, rows = server.fetch_query_rows(conn, OrderedDict(), "SELECT id FROM t", None, 3)
+
+    assert (columns, rows) == (["id"], [(0,), (1,), (2,), (3,)])
+    cursor, = conn.cursors
+    assert cursor.rows == [(n,) for n in range(4, 10)]
+    assert cursor.executed[-1] == ("CLOSE mcp_stream", None)